@@ -4,6 +4,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import random
 import time
 from datetime import datetime, timedelta
@@ -12,11 +13,16 @@ from dotenv import load_dotenv
 from passlib.context import CryptContext
 from fastapi.openapi.utils import get_openapi
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from bson import ObjectId
 
 from app.utils.otp_utils import send_email_otp, verify_email_otp
 
 from app.utils.report_utils import generate_user_report
-from app.services.model_service import infer as model_infer
+from app.services.model_service import infer as model_infer, risk_level as score_risk_level
+from app.services.risk_index import risk_index, build_risk_index
+from app.services.job_service import job_runner
+from app.services.explain_service import explain as explain_prediction, score as model_score, load_feature_meta
+from app.services.retention_service import ensure_retention_indexes, find_predictions, find_archived_prediction, archived_prediction_count
 
 from database.mongodb import users_collection, predictions_collection, contacts_collection
 
@@ -31,6 +37,7 @@ try:
     gat_lstm_model = load_gatlstm_model("app/models/gatlstm_model.pth")
 except Exception as e:
     print("⚠️ Model not loaded yet:", e)
+FEATURE_META = load_feature_meta("app/models/gatlstm_model.pth")
 
 
 # ------------------------------------------
@@ -123,6 +130,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ------------------------------------------
+# Startup: warm the triage risk index
+# ------------------------------------------
+@app.on_event("startup")
+async def warm_risk_index():
+    try:
+        await predictions_collection.create_index([("email", 1), ("timestamp", -1)])
+        await build_risk_index()
+    except Exception as e:
+        print("⚠️ Risk index not built:", e)
+
+# ------------------------------------------
+# Startup: resume unfinished background jobs
+# ------------------------------------------
+@app.on_event("startup")
+async def resume_background_jobs():
+    try:
+        await job_runner.start()
+    except Exception as e:
+        print("⚠️ Background jobs not resumed:", e)
+
+# ------------------------------------------
+# Startup: retention indexes (contacts TTL, archive lookups)
+# ------------------------------------------
+@app.on_event("startup")
+async def setup_retention():
+    try:
+        await ensure_retention_indexes()
+    except Exception as e:
+        print("⚠️ Retention indexes not created:", e)
+
 # ------------------------------------------
 # Root
 # ------------------------------------------
@@ -264,7 +302,8 @@ async def contact_us(data: dict):
             "name": name,
             "email": email,
             "message": message,
-            "timestamp": int(time.time())
+            "timestamp": int(time.time()),
+            "created_at": datetime.utcnow()  # TTL index field
         })
     except Exception:
         pass
@@ -287,49 +326,104 @@ async def predict_outcome(data: dict):
     except (TypeError, ValueError):
         raise HTTPException(status_code=400, detail="Invalid input data")
 
-    predicted_los = round((age % 7) + (heart_rate / 100) + random.uniform(0.5, 2.0), 1)
-    ihm_score = min(
-        100,
-        max(0, (respiratory_rate * 1.2) + (age / 5) - (systolic_bp / 10) + random.uniform(-5, 5)),
-    )
-    risk_level = "High" if ihm_score > 60 else "Moderate" if ihm_score > 30 else "Low"
+    explain = data.get("explain", False)
+    if not isinstance(explain, bool):
+        raise HTTPException(status_code=400, detail="explain must be true or false")
+
+    # 🧠 One scorer for every request: the GAT-LSTM whenever it and its feature meta are loaded
+    model_ready = gat_lstm_model is not None and FEATURE_META is not None
+    if model_ready:
+        scores = await asyncio.to_thread(model_score, gat_lstm_model, data, FEATURE_META)
+        predicted_los = scores["predicted_LOS_days"]
+        ihm_score = scores["in_hospital_mortality_%"]
+        score_source = "gat_lstm"
+    else:
+        predicted_los = round((age % 7) + (heart_rate / 100) + random.uniform(0.5, 2.0), 1)
+        ihm_score = min(
+            100,
+            max(0, (respiratory_rate * 1.2) + (age / 5) - (systolic_bp / 10) + random.uniform(-5, 5)),
+        )
+        score_source = "placeholder"
+
+    # 🔍 Opt-in explainability (batched integrated gradients) of that same model, cached with the prediction
+    explanation = None
+    if explain:
+        if gat_lstm_model is None:
+            explanation = {"available": False, "reason": "GAT-LSTM model not loaded"}
+        elif FEATURE_META is None:
+            explanation = {"available": False, "reason": "gatlstm_model_meta.json missing; retrain to get normalisation stats"}
+        else:
+            explanation = await asyncio.to_thread(explain_prediction, gat_lstm_model, data, FEATURE_META)
+
+    risk_level = score_risk_level(ihm_score)
 
     # 🧠 Added print lines here
     print("🧠 Saving prediction to MongoDB for:", email)
 
-    result = await predictions_collection.insert_one({
+    prediction = {
         "email": email,
         "predicted_LOS_days": predicted_los,
         "in_hospital_mortality_%": round(ihm_score, 2),
         "mortality_risk_level": risk_level,
+        "score_source": score_source,
         "timestamp": int(time.time())
-    })
+    }
+    if explanation is not None:
+        prediction["explanation"] = explanation
+
+    result = await predictions_collection.insert_one(prediction)
 
     print("✅ Prediction inserted with ID:", result.inserted_id)
 
-    return {
+    # Keep the triage index current with this patient's latest prediction
+    patient = await users_collection.find_one({"email": email}, {"password": 0})
+    risk_index.update(prediction, user=patient)
+
+    response = {
         "patient_id": f"P{random.randint(1000, 9999)}",
+        "prediction_id": str(result.inserted_id),
         "predicted_LOS_days": predicted_los,
         "in_hospital_mortality_%": round(ihm_score, 2),
         "mortality_risk_level": risk_level,
+        "score_source": score_source,
         "message": "✅ Prediction successful (secured with JWT)"
     }
+    if explanation is not None:
+        response["explanation"] = explanation
+    return response
+
+
+# ------------------------------------------
+# Cached explanation for a stored prediction
+# ------------------------------------------
+@app.get("/predictions/{prediction_id}/explanation")
+async def get_prediction_explanation(prediction_id: str):
+    if not ObjectId.is_valid(prediction_id):
+        raise HTTPException(status_code=400, detail="Invalid prediction id")
+
+    prediction = await predictions_collection.find_one({"_id": ObjectId(prediction_id)}, {"explanation": 1})
+    if not prediction:
+        # moved out of the hot collection by the archive job; explanations are kept there
+        prediction = await find_archived_prediction(prediction_id)
+    if not prediction:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+    if not prediction.get("explanation"):
+        raise HTTPException(status_code=404, detail="No explanation stored; re-run /predict with \"explain\": true")
+
+    return {"prediction_id": prediction_id, "explanation": prediction["explanation"]}
 
 
 # ------------------------------------------
 # User History - Fetch all predictions by email
 # ------------------------------------------
 @app.get("/user/history")
-async def get_user_history(email: str):
-    predictions = await predictions_collection.find({"email": email}).to_list(length=None)
+async def get_user_history(email: str, start: int = None, end: int = None):
+    # start/end are epoch seconds; archived predictions in the range are merged in
+    predictions = await find_predictions(email=email, start=start, end=end)
     
     if not predictions:
         raise HTTPException(status_code=404, detail="No predictions found for this user")
     
-    # Optional: clean up ObjectId for readability
-    for p in predictions:
-        p["_id"] = str(p["_id"])
-    
     return {
         "email": email,
         "total_predictions": len(predictions),
@@ -366,7 +460,8 @@ async def doctor_patients():
 async def admin_analytics():
     # Count totals
     total_users = await users_collection.count_documents({})
-    total_predictions = await predictions_collection.count_documents({})
+    hot_predictions = await predictions_collection.count_documents({})
+    archived_predictions = await archived_prediction_count()
     total_doctors = await users_collection.count_documents({"role": "Doctor"})
     total_patients = await users_collection.count_documents({"role": "Patient"})
 
@@ -388,7 +483,8 @@ async def admin_analytics():
             "total_users": total_users,
             "total_doctors": total_doctors,
             "total_patients": total_patients,
-            "total_predictions": total_predictions
+            "total_predictions": hot_predictions + archived_predictions,
+            "archived_predictions": archived_predictions
         },
         "recent_predictions": recent_activity
     }
@@ -397,8 +493,8 @@ async def admin_analytics():
 # ------------------------------------------
 @app.get("/user/download-report")
 async def download_user_report(email: str):
-    # Fetch all predictions for the user
-    predictions = await predictions_collection.find({"email": email}).to_list(length=None)
+    # Fetch all predictions for the user (hot + archived), oldest first
+    predictions = list(reversed(await find_predictions(email=email)))
 
     if not predictions:
         return {"message": f"No predictions found for {email}"}
@@ -415,3 +511,13 @@ app.include_router(admin_routes.router, prefix="/admin", tags=["Admin"])
 # ------------------------------------------
 from app.routes import dashboard_routes
 app.include_router(dashboard_routes.router, prefix="/dashboard", tags=["Dashboard"])
+# ------------------------------------------
+# Include Triage Routes
+# ------------------------------------------
+from app.routes import triage_routes
+app.include_router(triage_routes.router, prefix="/doctor", tags=["Triage"])
+# ------------------------------------------
+# Include Background Job Routes
+# ------------------------------------------
+from app.routes import job_routes
+app.include_router(job_routes.router, prefix="/jobs", tags=["Jobs"])
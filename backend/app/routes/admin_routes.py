@@ -1,12 +1,19 @@
 # backend/app/routes/admin_routes.py
 from fastapi import APIRouter, Depends, HTTPException
-from app.utils.auth_utils import authorize_roles
-from database.mongodb import users_collection, predictions_collection
+from app.utils.auth_utils import authorize_roles, get_current_user
+from database.mongodb import users_collection, prediction_archive_collection
+from app.services.retention_service import find_predictions
+from app.services.risk_index import risk_index
 
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 router = APIRouter()
 
+
+async def admin_only(user=Depends(get_current_user)):
+    return await authorize_roles(["Admin"], user)
+
 # ✅ Get all users (Admin only)
 @router.get("/users", tags=["Admin"])
 async def get_all_users(user=Depends(lambda: authorize_roles(["Admin"]))):
@@ -21,13 +28,15 @@ async def update_user_role(user_id: str, data: dict, user=Depends(lambda: author
     if new_role not in ["Admin", "Doctor", "Patient", "User"]:
         raise HTTPException(status_code=400, detail="Invalid role")
 
-    result = await users_collection.update_one(
+    updated = await users_collection.find_one_and_update(
         {"_id": ObjectId(user_id)},
-        {"$set": {"role": new_role}}
+        {"$set": {"role": new_role}},
+        return_document=ReturnDocument.AFTER,
     )
 
-    if result.matched_count == 0:
+    if not updated:
         raise HTTPException(status_code=404, detail="User not found")
+    risk_index.refresh_user(updated)
 
     return {"message": f"User role updated to {new_role}"}
 
@@ -35,14 +44,29 @@ async def update_user_role(user_id: str, data: dict, user=Depends(lambda: author
 # ✅ Delete user (Admin only)
 @router.delete("/users/{user_id}", tags=["Admin"])
 async def delete_user(user_id: str, user=Depends(lambda: authorize_roles(["Admin"]))):
-    result = await users_collection.delete_one({"_id": ObjectId(user_id)})
-    if result.deleted_count == 0:
+    deleted = await users_collection.find_one_and_delete({"_id": ObjectId(user_id)})
+    if not deleted:
         raise HTTPException(status_code=404, detail="User not found")
+    risk_index.discard(deleted.get("email"))
     return {"message": "User deleted successfully"}
 
 
 # ✅ Get all predictions (Admin only)
 @router.get("/predictions", tags=["Admin"])
-async def get_all_predictions(user=Depends(lambda: authorize_roles(["Admin"]))):
-    preds = await predictions_collection.find().to_list(length=1000)
+async def get_all_predictions(start: int = None, end: int = None, limit: int = 1000,
+                              user=Depends(admin_only)):
+    # start/end are epoch seconds; archived predictions in the range are merged in
+    preds = await find_predictions(start=start, end=end, limit=limit)
     return {"count": len(preds), "predictions": preds}
+
+
+# ✅ Per-patient monthly summaries of archived predictions (Admin only)
+@router.get("/predictions/archive", tags=["Admin"])
+async def get_archived_summaries(email: str = None, month: str = None, limit: int = 500,
+                                 user=Depends(admin_only)):
+    query = {k: v for k, v in (("email", email), ("month", month)) if v}
+    summaries = await prediction_archive_collection.find(query, {"_id": 0, "chunks": 0, "explained_ids": 0}).sort("month", -1).to_list(length=limit)
+    for s in summaries:
+        s["avg_LOS_days"] = round(s["los_sum"] / s["count"], 2) if s.get("count") else None
+        s["avg_mortality_%"] = round(s["mortality_sum"] / s["count"], 2) if s.get("count") else None
+    return {"count": len(summaries), "summaries": summaries}
@@ -0,0 +1,132 @@
+# backend/app/routes/job_routes.py
+import os
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from app.utils.auth_utils import get_current_user
+from app.services.job_service import job_runner
+from database.mongodb import jobs_collection
+
+router = APIRouter()
+
+# job types a role may submit
+JOB_PERMISSIONS = {
+    "user_report": ["Admin", "Doctor", "Patient", "User"],
+    "rescore": ["Admin"],
+    "archive_predictions": ["Admin"],
+}
+
+
+def _validate_params(job_type: str, params: dict) -> dict:
+    """Reject bad params with a 400 up front instead of letting the job fail later"""
+    if not isinstance(params, dict):
+        raise HTTPException(status_code=400, detail="params must be an object")
+
+    allowed = {"user_report": {"email"}, "rescore": set(), "archive_predictions": {"hot_days"}}[job_type]
+    unknown = set(params) - allowed
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown params for {job_type}: {sorted(unknown)}")
+
+    if "email" in params and not (isinstance(params["email"], str) and params["email"]):
+        raise HTTPException(status_code=400, detail="email must be a non-empty string")
+    if "hot_days" in params:
+        hot_days = params["hot_days"]
+        if isinstance(hot_days, bool) or not isinstance(hot_days, int) or hot_days < 1:
+            raise HTTPException(status_code=400, detail="hot_days must be a positive integer")
+    return params
+
+
+def _is_admin(user: dict) -> bool:
+    return user.get("role", "").lower() == "admin"
+
+
+async def _get_owned_job(job_id: str, user: dict) -> dict:
+    job = await jobs_collection.find_one({"_id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["owner"] != user["email"] and not _is_admin(user):
+        raise HTTPException(status_code=403, detail="Access denied 🚫")
+    return job
+
+
+def _job_summary(job: dict) -> dict:
+    progress = job.get("progress") or {}
+    processed, total = progress.get("processed", 0), progress.get("total")
+    return {
+        "job_id": job["_id"],
+        "type": job["type"],
+        "status": job["status"],
+        "progress": {
+            "processed": processed,
+            "total": total,
+            "percent": round(100 * processed / total, 1) if total else (100.0 if job["status"] == "completed" else 0.0),
+        },
+        "error": job.get("error"),
+        "created_at": job.get("created_at"),
+        "updated_at": job.get("updated_at"),
+    }
+
+
+# ✅ Submit a background job
+@router.post("", tags=["Jobs"])
+async def submit_job(data: dict, user=Depends(get_current_user)):
+    job_type = data.get("type")
+    params = data.get("params") or {}
+
+    if job_type not in job_runner.job_types:
+        raise HTTPException(status_code=400, detail=f"Invalid job type. Choose from {job_runner.job_types}")
+    params = _validate_params(job_type, params)
+
+    allowed = [r.lower() for r in JOB_PERMISSIONS.get(job_type, [])]
+    if user.get("role", "").lower() not in allowed:
+        raise HTTPException(status_code=403, detail="Access denied 🚫")
+
+    if job_type == "user_report":
+        params["email"] = params.get("email") or user["email"]
+        if params["email"] != user["email"] and user.get("role", "").lower() not in ["admin", "doctor"]:
+            raise HTTPException(status_code=403, detail="You can only request your own report")
+
+    job = await job_runner.submit(job_type, params, owner=user["email"])
+    return {"message": "Job submitted ⏳", **_job_summary(job)}
+
+
+# ✅ List my jobs (Admins see everything)
+@router.get("", tags=["Jobs"])
+async def list_jobs(limit: int = 50, user=Depends(get_current_user)):
+    query = {} if _is_admin(user) else {"owner": user["email"]}
+    jobs = await jobs_collection.find(query).sort("created_at", -1).limit(min(limit, 500)).to_list(length=None)
+    return {"count": len(jobs), "jobs": [_job_summary(j) for j in jobs]}
+
+
+# ✅ Job status
+@router.get("/{job_id}", tags=["Jobs"])
+async def job_status(job_id: str, user=Depends(get_current_user)):
+    job = await _get_owned_job(job_id, user)
+    summary = _job_summary(job)
+    if job["status"] == "completed":
+        summary["result"] = {k: v for k, v in (job.get("result") or {}).items() if k != "path"}
+    return summary
+
+
+# ✅ Job progress only (cheap polling)
+@router.get("/{job_id}/progress", tags=["Jobs"])
+async def job_progress(job_id: str, user=Depends(get_current_user)):
+    job = await _get_owned_job(job_id, user)
+    summary = _job_summary(job)
+    return {"job_id": job_id, "status": summary["status"], **summary["progress"]}
+
+
+# ✅ Download a finished job's file
+@router.get("/{job_id}/result", tags=["Jobs"])
+async def job_result(job_id: str, user=Depends(get_current_user)):
+    job = await _get_owned_job(job_id, user)
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    result = job.get("result") or {}
+    path = result.get("path")
+    if not path:
+        return {"job_id": job_id, "result": result}
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Result file no longer available")
+
+    return FileResponse(path, media_type=result.get("media_type"), filename=result.get("filename"))
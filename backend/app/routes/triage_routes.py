@@ -0,0 +1,51 @@
+# backend/app/routes/triage_routes.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.utils.auth_utils import authorize_roles, get_current_user
+from app.services.risk_index import risk_index, RISK_LEVELS
+
+router = APIRouter()
+
+
+async def doctor_or_admin(user=Depends(get_current_user)):
+    return await authorize_roles(["Doctor", "Admin"], user)
+
+
+def _resolve_hospital(user: dict, hospital: str):
+    """Doctors are limited to their own hospital; Admins may pick any (or all)"""
+    if user.get("role", "").lower() == "admin":
+        return hospital or None
+    return user.get("hospital") or "N/A"
+
+
+# ✅ Triage list: top-K / score-range over each patient's latest prediction
+@router.get("/triage", tags=["Triage"])
+async def triage_patients(
+    risk_level: str = Query(None, description="High, Moderate or Low"),
+    min_mortality: float = Query(None, ge=0, le=100),
+    max_mortality: float = Query(None, ge=0, le=100),
+    hospital: str = Query(None, description="Admin only; doctors always see their own hospital"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    user=Depends(doctor_or_admin),
+):
+    if risk_level is not None:
+        risk_level = risk_level.capitalize()
+        if risk_level not in RISK_LEVELS:
+            raise HTTPException(status_code=400, detail="Invalid risk level")
+
+    hospital = _resolve_hospital(user, hospital)
+    total, patients = risk_index.query(hospital, risk_level, min_mortality, max_mortality, limit, offset)
+
+    return {
+        "hospital": hospital or "All",
+        "risk_level": risk_level or "All",
+        "total": total,
+        "patients": patients,
+    }
+
+
+# ✅ Risk level counts for the triage header
+@router.get("/triage/summary", tags=["Triage"])
+async def triage_summary(hospital: str = Query(None), user=Depends(doctor_or_admin)):
+    hospital = _resolve_hospital(user, hospital)
+    return {"hospital": hospital or "All", "counts": risk_index.counts(hospital)}
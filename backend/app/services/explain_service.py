@@ -0,0 +1,157 @@
+# backend/app/services/explain_service.py
+import json
+import os
+
+import numpy as np
+import torch
+
+from app.training.eicu_dataset import VITAL_COLUMNS, WINDOW_HOURS
+
+IG_STEPS = int(os.getenv("EXPLAIN_IG_STEPS", "32"))
+TOP_FEATURES = 8
+
+# /predict field names -> eICU vitalPeriodic names used by the model
+FIELD_ALIASES = {
+    "heart_rate": "heartrate",
+    "respiratory_rate": "respiration",
+    "systolic_bp": "systemicsystolic",
+    "diastolic_bp": "systemicdiastolic",
+    "mean_bp": "systemicmean",
+    "spo2": "sao2",
+    "oxygen_level": "sao2",
+}
+
+OUTPUTS = ["predicted_LOS_days", "mortality_logit"]
+
+
+def load_feature_meta(model_path: str = "app/models/gatlstm_model.pth"):
+    """
+    Feature names + normalisation stats written by app.training.train next to the model.
+    Returns None when missing: without them the model would see raw, unnormalised vitals.
+    """
+    path = os.path.splitext(model_path)[0] + "_meta.json"
+    if not os.path.exists(path):
+        if os.path.exists(model_path):
+            print(f"⚠️ {path} not found; explanations disabled until the model is retrained")
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_model_input(data: dict, meta: dict) -> torch.Tensor:
+    """
+    Turn a /predict payload into a (1, hours, 32) window.
+    `data["vitals"]` may hold an hourly list of {eICU name: value}; otherwise the flat
+    fields (heart_rate, systolic_bp, ...) are treated as one reading held for the whole window.
+    """
+    hours = int(meta.get("window_hours", WINDOW_HOURS))
+    mean, std = np.asarray(meta["mean"]), np.asarray(meta["std"])
+    n_vitals = len(VITAL_COLUMNS)
+
+    def to_row(reading: dict):
+        row = np.full(n_vitals, np.nan)
+        for key, value in reading.items():
+            name = FIELD_ALIASES.get(key, key)
+            if name in VITAL_COLUMNS and value is not None:
+                try:
+                    row[VITAL_COLUMNS.index(name)] = float(value)
+                except (TypeError, ValueError):
+                    pass
+        return row
+
+    series = data.get("vitals")
+    series = [to_row(r) for r in series[-hours:] if isinstance(r, dict)] if isinstance(series, list) else []
+    if series:
+        # left-pad short series so the latest reading sits at the last hour
+        rows = np.concatenate([np.full((hours - len(series), n_vitals), np.nan), np.stack(series)])
+    else:
+        rows = np.tile(to_row(data), (hours, 1))
+
+    observed = ~np.isnan(rows)
+    values = np.nan_to_num((rows - mean) / std, nan=0.0)
+    window = np.concatenate([values, observed.astype(np.float64)], axis=1)
+    return torch.tensor(window, dtype=torch.float32).unsqueeze(0)
+
+
+def _collect_attention(model) -> dict:
+    """Attention weights left on any submodule as `attention_weights` (GAT layers) after a forward pass"""
+    weights = {}
+    for name, module in model.named_modules():
+        attn = getattr(module, "attention_weights", None)
+        if isinstance(attn, torch.Tensor):
+            weights[name or "model"] = attn.detach().cpu().tolist()
+    return weights
+
+
+def integrated_gradients(model, x: torch.Tensor, baseline: torch.Tensor = None, steps: int = IG_STEPS):
+    """
+    Integrated gradients for every model output in one vectorised pass.
+
+    All `steps` interpolations between baseline and input go through the model as a
+    single batch; one backward per output (2) replaces 32 per-feature re-runs.
+    Returns attributions shaped (outputs, batch, hours, features) and the model outputs.
+    """
+    baseline = torch.zeros_like(x) if baseline is None else baseline
+    alphas = (torch.arange(1, steps + 1, dtype=x.dtype) / steps).view(steps, 1, 1, 1)
+
+    path = (baseline.unsqueeze(0) + alphas * (x - baseline).unsqueeze(0))
+    path = path.reshape(-1, *x.shape[1:]).requires_grad_(True)
+    out = model(path).view(steps, x.shape[0], -1)
+
+    n_outputs = out.shape[-1]
+    grads = []
+    for k in range(n_outputs):
+        (g,) = torch.autograd.grad(out[..., k].sum(), path, retain_graph=k < n_outputs - 1)
+        grads.append(g.view(steps, *x.shape).mean(dim=0))
+
+    attributions = torch.stack(grads) * (x - baseline).unsqueeze(0)
+    with torch.no_grad():
+        # input last, so any attention weights left on the model belong to x
+        base_outputs = model(baseline)
+        outputs = model(x)
+    return attributions.detach(), outputs, base_outputs
+
+
+def _model_output(outputs: torch.Tensor) -> dict:
+    return {
+        "predicted_LOS_days": round(float(outputs[0, 0]), 3),
+        "in_hospital_mortality_%": round(float(torch.sigmoid(outputs[0, 1])) * 100, 2),
+    }
+
+
+def score(model, data: dict, meta: dict) -> dict:
+    """GAT-LSTM scores for one /predict payload (a plain forward pass, no attributions)"""
+    model.eval()
+    with torch.no_grad():
+        return _model_output(model(build_model_input(data, meta)))
+
+
+def explain(model, data: dict, meta: dict, steps: int = IG_STEPS) -> dict:
+    """Feature and timestep attributions (plus GAT attention if present) for one /predict payload"""
+    model.eval()
+    x = build_model_input(data, meta)
+    attributions, outputs, base_outputs = integrated_gradients(model, x, steps=steps)
+    features = meta["features"]
+
+    explanation = {
+        "method": "integrated_gradients",
+        "steps": steps,
+        "baseline": "cohort mean, nothing observed",
+        "model_output": _model_output(outputs),
+    }
+    for k, output in enumerate(OUTPUTS):
+        attr = attributions[k, 0]  # (hours, features)
+        per_feature = attr.sum(dim=0)
+        order = torch.argsort(per_feature.abs(), descending=True)[:TOP_FEATURES]
+        explanation[output] = {
+            "feature_attributions": {features[i]: round(float(per_feature[i]), 5) for i in range(len(features))},
+            "top_features": [features[i] for i in order.tolist()],
+            "timestep_attributions": [round(float(v), 5) for v in attr.sum(dim=1)],
+            # IG completeness: should be close to 0 with enough steps
+            "convergence_delta": round(float(attr.sum() - (outputs[0, k] - base_outputs[0, k])), 5),
+        }
+
+    attention = _collect_attention(model)
+    if attention:
+        explanation["attention_weights"] = attention
+    return explanation
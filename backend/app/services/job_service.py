@@ -0,0 +1,324 @@
+# backend/app/services/job_service.py
+import asyncio
+import csv
+import io
+import os
+import time
+import uuid
+
+from pymongo import UpdateOne, ReturnDocument
+
+from database.mongodb import jobs_collection, predictions_collection
+from app.services.model_service import risk_level
+from app.services.risk_index import rebuild_risk_index
+from app.utils.report_utils import REPORT_HEADER, report_row, report_filename
+
+JOB_RESULTS_DIR = os.getenv("JOB_RESULTS_DIR", "job_results")
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "1000"))
+LEASE_SECONDS = 120  # a running job whose lease is older than this is considered orphaned
+SWEEP_SECONDS = LEASE_SECONDS // 4  # lease heartbeat + orphan sweep interval
+
+
+class LeaseLost(Exception):
+    """This process no longer owns the job (its lease expired and another worker claimed it)"""
+
+
+class JobContext:
+    """What a handler sees: its params, the last checkpoint, and a way to save progress"""
+
+    def __init__(self, job: dict, worker_id: str):
+        self.job_id = job["_id"]
+        self.params = job.get("params", {})
+        self.state = job.get("checkpoint") or {}
+        self.worker_id = worker_id
+
+    def result_path(self, ext: str) -> str:
+        os.makedirs(JOB_RESULTS_DIR, exist_ok=True)
+        return os.path.join(JOB_RESULTS_DIR, f"{self.job_id}.{ext}")
+
+    async def checkpoint(self, state: dict, processed: int, total: int = None):
+        """Persist resumable state + progress after a chunk, and renew the lease"""
+        now = int(time.time())
+        result = await jobs_collection.update_one(
+            {"_id": self.job_id, "worker_id": self.worker_id},
+            {"$set": {
+                "checkpoint": state,
+                "progress.processed": processed,
+                "progress.total": total,
+                "lease_until": now + LEASE_SECONDS,
+                "updated_at": now,
+            }},
+        )
+        if result.matched_count == 0:
+            raise LeaseLost(self.job_id)
+        self.state = state
+
+
+class JobRunner:
+    """
+    In-process asyncio job runner with a MongoDB job table.
+
+    Handlers work in chunks and call ctx.checkpoint() after each one. While a job runs,
+    its process renews the lease every SWEEP_SECONDS; if the process dies the lease
+    expires and the next sweep (in any live process) resumes it from the last checkpoint.
+    Each job type has its own concurrency limit.
+    """
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self._handlers = {}
+        self._limits = {}
+        self._tasks = {}
+        self._claimed = set()  # job ids this process currently holds a lease on
+        self._sweeper = None
+
+    def register(self, job_type: str, handler, concurrency: int = 1):
+        self._handlers[job_type] = handler
+        self._limits[job_type] = asyncio.Semaphore(concurrency)
+
+    @property
+    def job_types(self):
+        return list(self._handlers)
+
+    async def submit(self, job_type: str, params: dict, owner: str) -> dict:
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        now = int(time.time())
+        job = {
+            "_id": uuid.uuid4().hex,
+            "type": job_type,
+            "params": params,
+            "owner": owner,
+            "status": "queued",
+            "progress": {"processed": 0, "total": None},
+            "checkpoint": None,
+            "result": None,
+            "error": None,
+            "worker_id": None,
+            "lease_until": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await jobs_collection.insert_one(job)
+        self._schedule(job)
+        return job
+
+    def _schedule(self, job: dict):
+        if job["_id"] in self._tasks:
+            return
+        task = asyncio.create_task(self._run(job["_id"], job["type"]))
+        self._tasks[job["_id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["_id"], None))
+
+    async def _claim(self, job_id: str):
+        """Atomically take a queued job, or a running one whose owner stopped renewing its lease"""
+        now = int(time.time())
+        return await jobs_collection.find_one_and_update(
+            {
+                "_id": job_id,
+                "$or": [
+                    {"status": "queued"},
+                    {"status": "running", "lease_until": {"$lt": now}},
+                ],
+            },
+            {"$set": {
+                "status": "running",
+                "worker_id": self.worker_id,
+                "lease_until": now + LEASE_SECONDS,
+                "updated_at": now,
+            }},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _run(self, job_id: str, job_type: str):
+        async with self._limits[job_type]:
+            job = await self._claim(job_id)
+            if not job:
+                return  # another worker has it
+
+            ctx = JobContext(job, self.worker_id)
+            self._claimed.add(job_id)
+            try:
+                result = await self._handlers[job_type](ctx)
+                update = {"status": "completed", "result": result}
+            except LeaseLost:
+                print(f"⚠️ Job {job_id} ({job_type}) lost its lease; leaving it to the new owner")
+                return
+            except Exception as e:
+                print(f"❌ Job {job_id} ({job_type}) failed:", e)
+                update = {"status": "failed", "error": str(e)}
+            finally:
+                self._claimed.discard(job_id)
+
+            update["updated_at"] = int(time.time())
+            await jobs_collection.update_one({"_id": job_id, "worker_id": self.worker_id}, {"$set": update})
+
+    async def start(self):
+        """Create indexes, resume orphaned jobs and keep sweeping for more"""
+        await jobs_collection.create_index([("status", 1), ("lease_until", 1)])
+        await jobs_collection.create_index([("owner", 1), ("created_at", -1)])
+        await self.resume()
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(SWEEP_SECONDS)
+            try:
+                await self.renew_leases()
+                await self.resume()
+            except Exception as e:
+                print("⚠️ Job sweep failed:", e)
+
+    async def renew_leases(self):
+        """
+        Heartbeat: keep leases alive for jobs this process is running, even between checkpoints.
+        A job whose lease can't be renewed was taken over elsewhere, so its local task is cancelled.
+        """
+        now = int(time.time())
+        for job_id in list(self._claimed):
+            result = await jobs_collection.update_one(
+                {"_id": job_id, "status": "running", "worker_id": self.worker_id},
+                {"$set": {"lease_until": now + LEASE_SECONDS}},
+            )
+            task = self._tasks.get(job_id)
+            if result.matched_count == 0 and task and job_id in self._claimed:
+                print(f"⚠️ Job {job_id} lost its lease; cancelling local run")
+                self._claimed.discard(job_id)
+                task.cancel()
+
+    async def resume(self):
+        """Re-schedule queued jobs and running jobs whose lease has expired (their process died)"""
+        now = int(time.time())
+        cursor = jobs_collection.find({
+            "$or": [
+                {"status": "queued"},
+                {"status": "running", "lease_until": {"$lt": now}},
+            ],
+        })
+        resumed = 0
+        async for job in cursor:
+            if job["type"] in self._handlers:
+                self._schedule(job)
+                resumed += 1
+        if resumed:
+            print(f"🔁 Resuming {resumed} background job(s)")
+        return resumed
+
+
+# ------------------------------------------
+# Job handlers
+# ------------------------------------------
+def _write_chunk(path: str, offset: int, rows: list, header: bool) -> int:
+    """Append CSV rows at a known-good byte offset (drops any partial write after a crash)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(REPORT_HEADER)
+    writer.writerows(rows)
+
+    with open(path, "r+b" if offset else "wb") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(buffer.getvalue().encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+async def user_report_job(ctx: JobContext) -> dict:
+    """
+    CSV of every prediction for params.email, written chunk by chunk:
+    archived months first (one per checkpoint), then the hot collection.
+    """
+    # imported here: retention_service registers its own job on this module's runner
+    from app.services.retention_service import archived_months, read_archived_month, archived_prediction_count
+
+    email = ctx.params["email"]
+    path = ctx.result_path("csv")
+    query = {"email": email}
+
+    state = ctx.state
+    total = state.get("total")
+    if total is None:
+        total = await predictions_collection.count_documents(query) + await archived_prediction_count(email)
+    months = state.get("months")
+    if months is None:
+        months = sorted(await archived_months(email))
+    month_index = state.get("month_index", 0)
+    last_id, processed, offset = state.get("last_id"), state.get("processed", 0), state.get("bytes", 0)
+
+    while month_index < len(months):
+        rows = await asyncio.to_thread(read_archived_month, months[month_index], None, None, email)
+        rows.sort(key=lambda p: (p["timestamp"], p["_id"]))
+        offset = await asyncio.to_thread(_write_chunk, path, offset, [report_row(p) for p in rows], offset == 0)
+        month_index += 1
+        processed += len(rows)
+        await ctx.checkpoint({
+            "months": months, "month_index": month_index,
+            "processed": processed, "bytes": offset, "total": total,
+        }, processed, total)
+
+    while True:
+        chunk_query = dict(query, **({"_id": {"$gt": last_id}} if last_id else {}))
+        chunk = await predictions_collection.find(chunk_query).sort("_id", 1).limit(JOB_CHUNK_SIZE).to_list(length=None)
+        if not chunk and offset:
+            break
+
+        rows = [report_row(p) for p in chunk]
+        offset = await asyncio.to_thread(_write_chunk, path, offset, rows, offset == 0)
+        if not chunk:
+            break
+
+        last_id = chunk[-1]["_id"]
+        processed += len(chunk)
+        await ctx.checkpoint({
+            "months": months, "month_index": month_index, "last_id": last_id,
+            "processed": processed, "bytes": offset, "total": total,
+        }, processed, total)
+
+    return {"path": path, "filename": report_filename(email), "media_type": "text/csv", "rows": processed}
+
+
+async def rescore_job(ctx: JobContext) -> dict:
+    """
+    Re-derive mortality_risk_level for every stored prediction with the current
+    HIGH/MODERATE_RISK_THRESHOLD, so old rows match what /predict assigns today.
+    """
+    state = ctx.state
+    total = state.get("total")
+    if total is None:
+        total = await predictions_collection.count_documents({})
+    last_id, processed, changed = state.get("last_id"), state.get("processed", 0), state.get("changed", 0)
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id else {}
+        chunk = await predictions_collection.find(
+            query, {"in_hospital_mortality_%": 1, "mortality_risk_level": 1}
+        ).sort("_id", 1).limit(JOB_CHUNK_SIZE).to_list(length=None)
+        if not chunk:
+            break
+
+        ops = []
+        for p in chunk:
+            level = risk_level(p.get("in_hospital_mortality_%") or 0)
+            if level != p.get("mortality_risk_level"):
+                ops.append(UpdateOne({"_id": p["_id"]}, {"$set": {"mortality_risk_level": level}}))
+        if ops:
+            await predictions_collection.bulk_write(ops, ordered=False)
+
+        last_id = chunk[-1]["_id"]
+        processed += len(chunk)
+        changed += len(ops)
+        await ctx.checkpoint({"last_id": last_id, "processed": processed, "changed": changed, "total": total}, processed, total)
+
+    # refresh triage index from the re-scored data (predictions made meanwhile are kept)
+    await rebuild_risk_index()
+
+    return {"processed": processed, "changed": changed}
+
+
+job_runner = JobRunner()
+job_runner.register("user_report", user_report_job, concurrency=int(os.getenv("JOB_LIMIT_USER_REPORT", "4")))
+job_runner.register("rescore", rescore_job, concurrency=int(os.getenv("JOB_LIMIT_RESCORE", "1")))
@@ -1,4 +1,5 @@
 # backend/app/services/model_service.py
+import os
 import random
 from datetime import datetime
 
@@ -10,6 +11,13 @@ def load_model():
 
 MODEL = load_model()
 
+# --- risk thresholds on in-hospital mortality % (change via env, then run a "rescore" job) ---
+HIGH_RISK_THRESHOLD = float(os.getenv("HIGH_RISK_THRESHOLD", "60"))
+MODERATE_RISK_THRESHOLD = float(os.getenv("MODERATE_RISK_THRESHOLD", "30"))
+
+def risk_level(ihm_score: float, high: float = HIGH_RISK_THRESHOLD, moderate: float = MODERATE_RISK_THRESHOLD) -> str:
+    return "High" if ihm_score > high else "Moderate" if ihm_score > moderate else "Low"
+
 # --- dummy inference function (safe & deterministic-ish) ---
 def infer(input_data: dict) -> dict:
     """
@@ -31,7 +39,7 @@ def infer(input_data: dict) -> dict:
         100.0,
         max(0.0, (respiratory_rate * 1.2) + (age / 5.0) - (systolic_bp / 10.0) + random.uniform(-5, 5))
     )
-    risk = "High" if ihm_score > 60 else "Moderate" if ihm_score > 30 else "Low"
+    risk = risk_level(ihm_score)
 
     return {
         "predicted_LOS_days": predicted_los,
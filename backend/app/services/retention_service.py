@@ -0,0 +1,399 @@
+# backend/app/services/retention_service.py
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from database.mongodb import contacts_collection, predictions_collection, prediction_archive_collection
+from app.services.job_service import JobContext, job_runner, JOB_CHUNK_SIZE
+from app.services.risk_index import RISK_LEVELS
+
+CONTACT_TTL_DAYS = int(os.getenv("CONTACT_TTL_DAYS", "180"))
+PREDICTION_HOT_DAYS = int(os.getenv("PREDICTION_HOT_DAYS", "90"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+PREDICTION_FIELDS = ["email", "predicted_LOS_days", "in_hospital_mortality_%", "mortality_risk_level", "timestamp"]
+
+
+def _month(timestamp: int) -> str:
+    return datetime.utcfromtimestamp(timestamp).strftime("%Y-%m")
+
+
+# ------------------------------------------
+# Indexes: contacts TTL + archive lookups
+# ------------------------------------------
+async def ensure_archive_indexes():
+    """The unique (email, month) index is what makes replaying an archive chunk a no-op"""
+    await predictions_collection.create_index([("timestamp", 1), ("_id", 1)])
+    await prediction_archive_collection.create_index([("email", 1), ("month", 1)], unique=True)
+    await prediction_archive_collection.create_index("month")
+    await prediction_archive_collection.create_index("explained_ids", sparse=True)
+
+
+async def ensure_retention_indexes(contact_ttl_days: int = CONTACT_TTL_DAYS):
+    """Archive indexes, then create (or retune) the contacts TTL index; TTL needs a BSON date so old docs are backfilled"""
+    await ensure_archive_indexes()
+
+    await contacts_collection.update_many(
+        {"created_at": {"$exists": False}, "timestamp": {"$type": "number"}},
+        [{"$set": {"created_at": {"$toDate": {"$multiply": ["$timestamp", 1000]}}}}],
+    )
+
+    ttl_seconds = contact_ttl_days * 86400
+    try:
+        await contacts_collection.create_index("created_at", name="contacts_ttl", expireAfterSeconds=ttl_seconds)
+    except OperationFailure:
+        # index exists with a different TTL -> change it in place
+        await contacts_collection.database.command({
+            "collMod": contacts_collection.name,
+            "index": {"name": "contacts_ttl", "expireAfterSeconds": ttl_seconds},
+        })
+
+
+
+# ------------------------------------------
+# Archive files: <month>/<patient bucket>/<chunk>, compacted per bucket
+# ------------------------------------------
+ARCHIVE_BUCKETS = 256  # one patient's month lives in 1 of these, so a read opens ~1 file
+COMPACTED = "compacted"
+
+
+def _bucket(email: str) -> str:
+    return f"{int(hashlib.sha1((email or '').encode('utf-8')).hexdigest(), 16) % ARCHIVE_BUCKETS:03d}"
+
+
+def _archive_row(p: dict) -> dict:
+    row = {k: p.get(k) for k in PREDICTION_FIELDS}
+    row["_id"] = str(p["_id"])
+    row["explanation"] = json.dumps(p["explanation"]) if p.get("explanation") is not None else None
+    return row
+
+
+def _write_rows(folder: str, name: str, rows: list) -> str:
+    """Parquet (zstd) when pyarrow is installed, gzipped JSON lines otherwise; same name on replay"""
+    os.makedirs(folder, exist_ok=True)
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        pa = None
+
+    if pa is not None:
+        path = os.path.join(folder, f"{name}.parquet")
+        schema = pa.schema([
+            ("_id", pa.string()), ("email", pa.string()), ("predicted_LOS_days", pa.float64()),
+            ("in_hospital_mortality_%", pa.float64()), ("mortality_risk_level", pa.string()),
+            ("timestamp", pa.int64()), ("explanation", pa.string()),
+        ])
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), path + ".tmp", compression="zstd")
+    else:
+        path = os.path.join(folder, f"{name}.jsonl.gz")
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def _read_rows(path: str, start: int = None, end: int = None, email: str = None) -> list:
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        filters = [("email", "=", email)] if email else []
+        if start is not None:
+            filters.append(("timestamp", ">=", start))
+        if end is not None:
+            filters.append(("timestamp", "<=", end))
+        return pq.read_table(path, filters=filters or None).to_pylist()
+
+    rows = []
+    if path.endswith(".jsonl.gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                if (start is None or row["timestamp"] >= start) and (end is None or row["timestamp"] <= end) \
+                        and (not email or row["email"] == email):
+                    rows.append(row)
+    return rows
+
+
+def _archive_files(folder: str) -> list:
+    if not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, n) for n in sorted(os.listdir(folder)) if n.endswith((".parquet", ".jsonl.gz"))]
+
+
+def _write_archive_files(month: str, chunk_key: str, rows: list) -> list:
+    """One file per patient bucket this chunk touches; returns their "month/bucket" folders"""
+    by_bucket = {}
+    for row in rows:
+        by_bucket.setdefault(_bucket(row["email"]), []).append(row)
+
+    for bucket, bucket_rows in by_bucket.items():
+        _write_rows(os.path.join(ARCHIVE_DIR, "predictions", month, bucket), chunk_key, bucket_rows)
+    return [f"{month}/{bucket}" for bucket in by_bucket]
+
+
+def _compact_archive_folder(folder: str):
+    """
+    Merge a bucket's chunk files into one file sorted by (email, timestamp), so Parquet
+    row-group stats let a patient read skip other patients' rows. Crash-safe: the
+    compacted file replaces the old one atomically before the chunk files are removed,
+    and readers de-duplicate by _id in between.
+    """
+    folder = os.path.join(ARCHIVE_DIR, "predictions", folder)
+    paths = _archive_files(folder)
+    if len(paths) <= 1:
+        return
+
+    rows = {}
+    for path in paths:
+        for row in _read_rows(path):
+            rows[row["_id"]] = row
+    ordered = sorted(rows.values(), key=lambda r: (r["email"] or "", r["timestamp"], r["_id"]))
+
+    compacted = _write_rows(folder, COMPACTED, ordered)
+    for path in paths:
+        if path != compacted:
+            os.remove(path)
+
+
+def read_archived_month(month: str, start: int = None, end: int = None, email: str = None) -> list:
+    """
+    Rows from one month's archive whose timestamp falls in [start, end], de-duplicated by _id.
+    With an email only that patient's bucket is read.
+    """
+    root = os.path.join(ARCHIVE_DIR, "predictions", month)
+    if email:
+        folders = [os.path.join(root, _bucket(email))]
+    else:
+        folders = [os.path.join(root, b) for b in sorted(os.listdir(root))] if os.path.isdir(root) else []
+
+    rows = {}
+    for folder in folders:
+        for _ in range(3):
+            try:
+                for path in _archive_files(folder):
+                    for row in _read_rows(path, start, end, email):
+                        rows[row["_id"]] = row
+                break
+            except FileNotFoundError:
+                continue  # compacted underneath us; its merged file is in place now, list again
+
+    for row in rows.values():
+        if row.get("explanation"):
+            row["explanation"] = json.loads(row["explanation"])
+        row["archived"] = True
+    return list(rows.values())
+
+
+async def archived_months(email: str = None) -> list:
+    """Months that have archived rows (for one patient, or overall), newest first"""
+    if email:
+        docs = await prediction_archive_collection.find({"email": email}, {"month": 1}).to_list(length=None)
+        months = {d["month"] for d in docs}
+    else:
+        months = set(await prediction_archive_collection.distinct("month"))
+    return sorted(months, reverse=True)
+
+
+# ------------------------------------------
+# Queries: hot collection + archive, transparently
+# ------------------------------------------
+async def find_predictions(email: str = None, start: int = None, end: int = None, limit: int = None) -> list:
+    """
+    Predictions newest-first across the hot collection and the archive.
+    A missing start/end means "from the beginning"/"until now". Archive months are
+    read only if they overlap the range, newest first, stopping once `limit` is met.
+    """
+    query = {"email": email} if email else {}
+    if start is not None or end is not None:
+        query["timestamp"] = {k: v for k, v in (("$gte", start), ("$lte", end)) if v is not None}
+
+    hot = await predictions_collection.find(query).sort([("timestamp", -1), ("_id", -1)]).to_list(length=limit)
+    for p in hot:
+        p["_id"] = str(p["_id"])
+
+    start = 0 if start is None else start
+    end = int(time.time()) if end is None else end
+    months = [m for m in await archived_months(email) if _month(start) <= m <= _month(end)]
+
+    merged = hot
+    seen = {p["_id"] for p in hot}  # a crash mid-archive can leave a row in both places
+    for month in months:
+        # this and every older month predate the current limit-th row -> nothing left to add
+        if limit and len(merged) >= limit and merged[limit - 1].get("timestamp", 0) >= _next_month_start(month):
+            break
+
+        archived = await asyncio.to_thread(read_archived_month, month, start, end, email)
+        merged = merged + [p for p in archived if p["_id"] not in seen]
+        merged.sort(key=lambda p: (p.get("timestamp") or 0, p["_id"]), reverse=True)
+
+    return merged[:limit] if limit else merged
+
+
+def _next_month_start(month: str) -> int:
+    """Epoch seconds at the start of the month after YYYY-MM (UTC)"""
+    year, month = map(int, month.split("-"))
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+
+
+async def find_archived_prediction(prediction_id: str):
+    """An archived prediction that carried an explanation (its summary's explained_ids names the patient + month)"""
+    summary = await prediction_archive_collection.find_one({"explained_ids": prediction_id}, {"email": 1, "month": 1})
+    if not summary:
+        return None
+    rows = await asyncio.to_thread(read_archived_month, summary["month"], None, None, summary["email"])
+    return next((row for row in rows if row["_id"] == prediction_id), None)
+
+
+async def archived_prediction_count(email: str = None) -> int:
+    match = {"email": email} if email else {}
+    result = await prediction_archive_collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": None, "count": {"$sum": "$count"}}},
+    ]).to_list(length=1)
+    return result[0]["count"] if result else 0
+
+
+# ------------------------------------------
+# Archive job: compact predictions older than the hot window
+# ------------------------------------------
+def _summary_ops(chunk: list, chunk_key: str) -> list:
+    """Per-patient monthly summary upserts; `chunks` makes replaying a chunk a no-op"""
+    groups = {}
+    for p in chunk:
+        key = (p.get("email"), _month(p["timestamp"]))
+        groups.setdefault(key, []).append(p)
+
+    ops = []
+    for (email, month), preds in groups.items():
+        los = [p.get("predicted_LOS_days") or 0 for p in preds]
+        mort = [p.get("in_hospital_mortality_%") or 0 for p in preds]
+        inc = {"count": len(preds), "los_sum": sum(los), "mortality_sum": sum(mort)}
+        for level in RISK_LEVELS:
+            inc[f"risk_counts.{level}"] = sum(1 for p in preds if p.get("mortality_risk_level") == level)
+
+        ops.append(UpdateOne(
+            {"email": email, "month": month, "chunks": {"$ne": chunk_key}},
+            {
+                "$inc": inc,
+                "$min": {"los_min": min(los), "first_timestamp": min(p["timestamp"] for p in preds)},
+                "$max": {"los_max": max(los), "mortality_max": max(mort), "last_timestamp": max(p["timestamp"] for p in preds)},
+                "$addToSet": {
+                    "chunks": chunk_key,
+                    # where to find an archived explanation by prediction id
+                    "explained_ids": {"$each": [str(p["_id"]) for p in preds if p.get("explanation") is not None]},
+                },
+            },
+            upsert=True,
+        ))
+    return ops
+
+
+async def _latest_prediction_ids(emails: list) -> set:
+    """Each patient's newest prediction (same tie-break as the risk index) — these always stay hot"""
+    pipeline = [
+        {"$match": {"email": {"$in": emails}}},
+        {"$sort": {"email": 1, "timestamp": -1, "_id": -1}},
+        {"$group": {"_id": "$email", "latest": {"$first": "$_id"}}},
+    ]
+    return {doc["latest"] async for doc in predictions_collection.aggregate(pipeline)}
+
+
+async def archive_predictions_job(ctx: JobContext) -> dict:
+    """
+    Move predictions older than params.hot_days into monthly summaries + compressed files.
+    A patient's latest prediction is never archived, so the triage risk index (live or
+    rebuilt) always points at hot rows.
+    """
+    await ensure_archive_indexes()
+
+    state = ctx.state
+    hot_days = int(ctx.params.get("hot_days", PREDICTION_HOT_DAYS))
+    cutoff = state.get("cutoff") or int(time.time()) - hot_days * 86400
+    query = {"timestamp": {"$lt": cutoff}}
+
+    total = state.get("total")
+    if total is None:
+        total = await predictions_collection.count_documents(query)
+    processed, archived, files = state.get("processed", 0), state.get("archived", 0), state.get("files", 0)
+    last_ts, last_id = state.get("last_ts"), state.get("last_id")
+    touched = set(state.get("touched", []))  # "month/bucket" folders to compact at the end
+
+    # a chunk whose files are written but whose summaries/delete may not have finished
+    pending = state.get("pending")
+
+    while True:
+        if pending:
+            # resume it under the same key: rows it already deleted are in its files and
+            # summaries, so only the survivors are re-applied (and `chunks` skips done summaries)
+            archive = await predictions_collection.find({"_id": {"$in": pending["ids"]}}).to_list(length=None)
+        else:
+            # (timestamp, _id) cursor: kept latest rows stay behind it instead of being re-read
+            chunk_query = dict(query)
+            if last_id is not None:
+                chunk_query["$or"] = [
+                    {"timestamp": {"$gt": last_ts}},
+                    {"timestamp": last_ts, "_id": {"$gt": last_id}},
+                ]
+            chunk = await predictions_collection.find(chunk_query).sort([("timestamp", 1), ("_id", 1)]).limit(JOB_CHUNK_SIZE).to_list(length=None)
+            if not chunk:
+                break
+
+            keep = await _latest_prediction_ids(list({p.get("email") for p in chunk}))
+            archive = [p for p in chunk if p["_id"] not in keep]
+            pending = {
+                "key": str(chunk[0]["_id"]), "ids": [p["_id"] for p in archive],
+                "last_ts": chunk[-1]["timestamp"], "last_id": chunk[-1]["_id"], "size": len(chunk),
+            }
+
+            by_month = {}
+            for p in archive:
+                by_month.setdefault(_month(p["timestamp"]), []).append(_archive_row(p))
+            for month, rows in by_month.items():
+                folders = await asyncio.to_thread(_write_archive_files, month, pending["key"], rows)
+                touched.update(folders)
+                files += len(folders)
+
+            # nothing has been deleted yet, so until here a replay re-reads the same chunk and key
+            await ctx.checkpoint({
+                "cutoff": cutoff, "last_ts": last_ts, "last_id": last_id, "pending": pending,
+                "processed": processed, "archived": archived, "files": files, "total": total,
+                "touched": sorted(touched),
+            }, processed, total)
+
+        if archive:
+            try:
+                await prediction_archive_collection.bulk_write(_summary_ops(archive, pending["key"]), ordered=False)
+            except BulkWriteError as e:
+                # duplicate (email, month) on replay means that summary already has this chunk
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+            await predictions_collection.delete_many({"_id": {"$in": [p["_id"] for p in archive]}})
+
+        last_ts, last_id = pending["last_ts"], pending["last_id"]
+        processed += pending["size"]
+        archived += len(pending["ids"])
+        pending = None
+        await ctx.checkpoint({
+            "cutoff": cutoff, "last_ts": last_ts, "last_id": last_id,
+            "processed": processed, "archived": archived, "files": files, "total": total,
+            "touched": sorted(touched),
+        }, processed, total)
+
+    for folder in sorted(touched):
+        await asyncio.to_thread(_compact_archive_folder, folder)
+
+    return {"archived": archived, "kept_latest": processed - archived, "files_written": files, "cutoff": cutoff}
+
+
+job_runner.register("archive_predictions", archive_predictions_job, concurrency=1)
@@ -0,0 +1,181 @@
+# backend/app/services/risk_index.py
+import bisect
+from database.mongodb import predictions_collection
+
+RISK_LEVELS = ["High", "Moderate", "Low"]
+
+
+class RiskIndex:
+    """
+    In-memory index of each patient's latest prediction for triage queries.
+
+    Every entry lives in four sorted buckets — (hospital, risk), (hospital, any),
+    (any, risk) and (any, any) — ordered by mortality % descending, so top-K is a
+    slice and a score range is two bisects. Buckets hold keys of the form
+    (-mortality, -timestamp, email); `None` in a bucket key means "any".
+    """
+
+    def __init__(self):
+        self._latest = {}   # email -> entry dict
+        self._buckets = {}  # (hospital | None, risk | None) -> sorted list of keys
+        self._pending = None  # writes made while a rebuild runs, replayed onto the new index
+
+    def _record(self, op: str, *args):
+        if self._pending is not None:
+            self._pending.append((op, args))
+
+    def __len__(self):
+        return len(self._latest)
+
+    @staticmethod
+    def _key(entry: dict):
+        return (-float(entry["in_hospital_mortality_%"] or 0), -int(entry["timestamp"] or 0), entry["email"])
+
+    @staticmethod
+    def _bucket_names(entry: dict):
+        hospital, risk = entry["hospital"], entry["mortality_risk_level"]
+        return [(hospital, risk), (hospital, None), (None, risk), (None, None)]
+
+    def _remove(self, entry: dict):
+        key = self._key(entry)
+        for name in self._bucket_names(entry):
+            bucket = self._buckets.get(name)
+            if not bucket:
+                continue
+            i = bisect.bisect_left(bucket, key)
+            if i < len(bucket) and bucket[i] == key:
+                del bucket[i]
+
+    def update(self, prediction: dict, hospital: str = None, user: dict = None):
+        """Insert / replace a patient's entry if this prediction is their newest one"""
+        email = prediction.get("email")
+        if not email:
+            return
+        self._record("update", prediction, hospital, user)
+
+        timestamp = prediction.get("timestamp") or 0
+        prediction_id = str(prediction.get("_id")) if prediction.get("_id") else None
+        previous = self._latest.get(email)
+        # timestamps are whole seconds; ties go to the larger ObjectId (same order as the rebuild's sort)
+        if previous and (previous["timestamp"], previous["prediction_id"] or "") > (timestamp, prediction_id or ""):
+            return
+
+        user = user or {}
+        entry = {
+            "email": email,
+            "username": user.get("username"),
+            "patient_id": user.get("patient_id"),
+            "hospital": hospital or user.get("hospital") or "N/A",
+            "prediction_id": prediction_id,
+            "predicted_LOS_days": prediction.get("predicted_LOS_days"),
+            "in_hospital_mortality_%": prediction.get("in_hospital_mortality_%"),
+            "mortality_risk_level": prediction.get("mortality_risk_level"),
+            "timestamp": timestamp,
+        }
+
+        self._put(entry)
+
+    def _put(self, entry: dict):
+        previous = self._latest.get(entry["email"])
+        if previous:
+            self._remove(previous)
+        self._latest[entry["email"]] = entry
+        key = self._key(entry)
+        for name in self._bucket_names(entry):
+            bisect.insort(self._buckets.setdefault(name, []), key)
+
+    def refresh_user(self, user: dict):
+        """Re-key a patient's entry after their user doc changed (e.g. moved hospital)"""
+        self._record("refresh_user", user)
+        entry = self._latest.get(user.get("email"))
+        if entry:
+            self._put(dict(
+                entry,
+                username=user.get("username"),
+                patient_id=user.get("patient_id"),
+                hospital=user.get("hospital") or "N/A",
+            ))
+
+    def replace_with(self, other: "RiskIndex"):
+        """
+        Swap in a freshly built index in one step (no empty window for readers).
+        Writes recorded since begin_rebuild() are replayed onto it first, so predictions
+        made while it was being built are not lost.
+        """
+        for op, args in self._pending or []:
+            getattr(other, op)(*args)
+        self._latest, self._buckets = other._latest, other._buckets
+        self._pending = None
+
+    def begin_rebuild(self):
+        self._pending = []
+
+    def discard(self, email: str):
+        self._record("discard", email)
+        entry = self._latest.pop(email, None)
+        if entry:
+            self._remove(entry)
+
+    def get(self, email: str):
+        return self._latest.get(email)
+
+    def query(self, hospital: str = None, risk_level: str = None, min_mortality: float = None,
+              max_mortality: float = None, limit: int = 50, offset: int = 0):
+        """Patients sorted by mortality % (highest first), optionally restricted to a score range"""
+        bucket = self._buckets.get((hospital, risk_level), [])
+
+        start, stop = 0, len(bucket)
+        if max_mortality is not None:
+            start = bisect.bisect_left(bucket, (-float(max_mortality),))
+        if min_mortality is not None:
+            stop = bisect.bisect_right(bucket, (-float(min_mortality), float("inf")))
+
+        total = max(0, stop - start)
+        keys = bucket[start + offset:min(stop, start + offset + limit)]
+        return total, [self._latest[k[2]] for k in keys]
+
+    def counts(self, hospital: str = None) -> dict:
+        """Number of patients per risk level"""
+        return {level: len(self._buckets.get((hospital, level), [])) for level in RISK_LEVELS}
+
+
+risk_index = RiskIndex()
+
+
+async def build_risk_index(index: RiskIndex = risk_index):
+    """Load every patient's latest prediction (plus their hospital) from MongoDB"""
+    pipeline = [
+        {"$sort": {"timestamp": -1, "_id": -1}},
+        {"$group": {"_id": "$email", "prediction": {"$first": "$$ROOT"}}},
+        {"$lookup": {
+            "from": "users",
+            "localField": "_id",
+            "foreignField": "email",
+            "as": "user",
+        }},
+        {"$project": {
+            "prediction": 1,
+            "user": {"$arrayElemAt": ["$user", 0]},
+        }},
+        {"$project": {"user.password": 0}},
+    ]
+
+    loaded = 0
+    async for doc in predictions_collection.aggregate(pipeline, allowDiskUse=True):
+        index.update(doc["prediction"], user=doc.get("user"))
+        loaded += 1
+
+    print(f"✅ Risk index built with {loaded} patients")
+    return loaded
+
+
+async def rebuild_risk_index(index: RiskIndex = risk_index):
+    """Build a new index off to the side while `index` keeps serving, then swap it in"""
+    index.begin_rebuild()
+    try:
+        fresh = RiskIndex()
+        loaded = await build_risk_index(fresh)
+        index.replace_with(fresh)
+    finally:
+        index._pending = None
+    return loaded
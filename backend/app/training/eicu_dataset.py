@@ -0,0 +1,211 @@
+# backend/app/training/eicu_dataset.py
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import Dataset
+
+# ------------------------------------------
+# eICU columns used to build model inputs
+# ------------------------------------------
+STAY_ID = "patientunitstayid"
+OFFSET = "observationoffset"
+
+# vitalPeriodic signals -> 16 values + 16 observed-masks = 32 model inputs
+VITAL_COLUMNS = [
+    "temperature", "sao2", "heartrate", "respiration",
+    "cvp", "etco2", "systemicsystolic", "systemicdiastolic",
+    "systemicmean", "pasystolic", "padiastolic", "pamean",
+    "st1", "st2", "st3", "icp",
+]
+NUM_FEATURES = len(VITAL_COLUMNS) * 2
+
+WINDOW_HOURS = 24
+CHUNK_ROWS = 500_000
+
+
+def _table_path(data_dir: str, name: str) -> str:
+    """Find an eICU table as Parquet or (gzipped) CSV"""
+    for ext in (".parquet", ".csv", ".csv.gz"):
+        path = os.path.join(data_dir, name + ext)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No {name}.parquet / {name}.csv(.gz) found in {data_dir}")
+
+
+def iter_table_chunks(path: str, columns: list, chunk_rows: int = CHUNK_ROWS):
+    """Yield DataFrames of at most `chunk_rows` rows without loading the whole table"""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet extracts requires pyarrow (pip install pyarrow)") from e
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_rows):
+            yield chunk
+
+
+# ------------------------------------------
+# Labels: one row per ICU stay from patient table
+# ------------------------------------------
+def load_stay_labels(data_dir: str, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """
+    Read LOS (days) and in-hospital mortality for every stay.
+    The patient table has one row per stay, so the result is small enough for RAM
+    even on the full cohort; it is still read in chunks to keep peak memory flat.
+    """
+    columns = [STAY_ID, "unitdischargeoffset", "hospitaldischargestatus"]
+    frames = []
+    for chunk in iter_table_chunks(_table_path(data_dir, "patient"), columns, chunk_rows):
+        chunk = chunk.dropna(subset=[STAY_ID, "unitdischargeoffset"])
+        frames.append(pd.DataFrame({
+            STAY_ID: chunk[STAY_ID].astype(np.int64),
+            "los_days": chunk["unitdischargeoffset"].astype(np.float32) / (60.0 * 24.0),
+            "mortality": (chunk["hospitaldischargestatus"].astype(str).str.lower() == "expired").astype(np.float32),
+        }))
+
+    labels = pd.concat(frames, ignore_index=True).drop_duplicates(STAY_ID)
+    return labels.sort_values(STAY_ID).reset_index(drop=True)
+
+
+# ------------------------------------------
+# Windows: memory-mapped (stays, hours, features) arrays
+# ------------------------------------------
+def build_windows(data_dir: str, out_dir: str, window_hours: int = WINDOW_HOURS,
+                  chunk_rows: int = CHUNK_ROWS) -> dict:
+    """
+    Stream vitalPeriodic in chunks and build hourly input windows on disk.
+
+    Rows may arrive in any order, so each chunk is scatter-added into per-hour
+    sum/count memmaps; a second pass over the stays turns them into means,
+    forward-fills gaps and z-normalises. Nothing larger than one chunk (or one
+    block of stays) is ever held in RAM.
+
+    Writes X.npy (N, window_hours, 32), y.npy (N, 2), stay_ids.npy and meta.json.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    labels = load_stay_labels(data_dir, chunk_rows)
+    stay_ids = labels[STAY_ID].to_numpy()
+    n_stays, n_vitals = len(stay_ids), len(VITAL_COLUMNS)
+    if n_stays == 0:
+        raise ValueError(f"No labelled stays found in {data_dir}")
+    np.save(os.path.join(out_dir, "stay_ids.npy"), stay_ids)
+    np.save(os.path.join(out_dir, "y.npy"), labels[["los_days", "mortality"]].to_numpy(np.float32))
+
+    cells = n_stays * window_hours * n_vitals
+    sums = np.lib.format.open_memmap(os.path.join(out_dir, "sums.tmp.npy"), mode="w+", dtype=np.float64, shape=(cells,))
+    counts = np.lib.format.open_memmap(os.path.join(out_dir, "counts.tmp.npy"), mode="w+", dtype=np.float32, shape=(cells,))
+    total = np.zeros(n_vitals, dtype=np.float64)
+    total_sq = np.zeros(n_vitals, dtype=np.float64)
+    total_n = np.zeros(n_vitals, dtype=np.float64)
+
+    # Pass 1: scatter raw observations into (stay, hour, vital) cells
+    vitals_path = _table_path(data_dir, "vitalPeriodic")
+    for chunk in iter_table_chunks(vitals_path, [STAY_ID, OFFSET] + VITAL_COLUMNS, chunk_rows):
+        chunk = chunk.dropna(subset=[STAY_ID, OFFSET])
+        stay = chunk[STAY_ID].to_numpy(np.int64)
+        hour = chunk[OFFSET].to_numpy(np.float64) // 60
+
+        row = np.searchsorted(stay_ids, stay)
+        row = np.minimum(row, n_stays - 1)
+        keep = (stay_ids[row] == stay) & (hour >= 0) & (hour < window_hours)
+        if not keep.any():
+            continue
+
+        values = chunk[VITAL_COLUMNS].to_numpy(np.float64)[keep]
+        base = (row[keep] * window_hours + hour[keep].astype(np.int64)) * n_vitals
+        observed = ~np.isnan(values)
+
+        cell = (base[:, None] + np.arange(n_vitals))[observed]
+        np.add.at(sums, cell, values[observed])
+        np.add.at(counts, cell, 1.0)
+
+        filled = np.where(observed, values, 0.0)
+        total += filled.sum(axis=0)
+        total_sq += (filled ** 2).sum(axis=0)
+        total_n += observed.sum(axis=0)
+
+    mean = np.divide(total, total_n, out=np.zeros_like(total), where=total_n > 0)
+    var = np.divide(total_sq, total_n, out=np.ones_like(total), where=total_n > 0) - mean ** 2
+    std = np.sqrt(np.maximum(var, 1e-6))
+
+    # Pass 2: block-wise mean -> forward-fill -> normalise into X.npy
+    X = np.lib.format.open_memmap(os.path.join(out_dir, "X.npy"), mode="w+", dtype=np.float32,
+                                  shape=(n_stays, window_hours, NUM_FEATURES))
+    sums = sums.reshape(n_stays, window_hours, n_vitals)
+    counts = counts.reshape(n_stays, window_hours, n_vitals)
+    block = max(1, chunk_rows // (window_hours * n_vitals))
+    for start in range(0, n_stays, block):
+        stop = min(start + block, n_stays)
+        s, c = sums[start:stop], counts[start:stop]
+        observed = c > 0
+        values = np.where(observed, s / np.maximum(c, 1), np.nan)
+
+        # forward-fill along time, remaining gaps fall back to the cohort mean
+        idx = np.where(observed, np.arange(window_hours)[None, :, None], 0)
+        np.maximum.accumulate(idx, axis=1, out=idx)
+        values = np.take_along_axis(values, idx, axis=1)
+        values = (values - mean) / std
+        values = np.nan_to_num(values, nan=0.0)
+
+        X[start:stop, :, :n_vitals] = values
+        X[start:stop, :, n_vitals:] = observed
+    X.flush()
+
+    del sums, counts, s, c
+    os.remove(os.path.join(out_dir, "sums.tmp.npy"))
+    os.remove(os.path.join(out_dir, "counts.tmp.npy"))
+
+    meta = {
+        "num_stays": int(n_stays),
+        "window_hours": int(window_hours),
+        "features": VITAL_COLUMNS + [f"{c}_observed" for c in VITAL_COLUMNS],
+        "mean": mean.tolist(),
+        "std": std.tolist(),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"✅ Built {n_stays} windows of {window_hours}h x {NUM_FEATURES} features in {out_dir}")
+    return meta
+
+
+# ------------------------------------------
+# Torch Dataset over the memmapped windows
+# ------------------------------------------
+class EICUWindowDataset(Dataset):
+    """Reads windows straight from X.npy / y.npy; each DataLoader worker opens its own memmap"""
+
+    def __init__(self, windows_dir: str, indices=None):
+        self.windows_dir = windows_dir
+        self._X = None
+        self._y = None
+        n = np.load(os.path.join(windows_dir, "y.npy"), mmap_mode="r").shape[0]
+        self.indices = np.arange(n) if indices is None else np.asarray(indices)
+
+    def _open(self):
+        if self._X is None:
+            self._X = np.load(os.path.join(self.windows_dir, "X.npy"), mmap_mode="r")
+            self._y = np.load(os.path.join(self.windows_dir, "y.npy"), mmap_mode="r")
+
+    def __getstate__(self):
+        # never pickle open memmaps into worker processes
+        state = self.__dict__.copy()
+        state["_X"] = None
+        state["_y"] = None
+        return state
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        self._open()
+        row = self.indices[i]
+        return torch.from_numpy(np.array(self._X[row])), torch.from_numpy(np.array(self._y[row]))
@@ -0,0 +1,165 @@
+# backend/app/training/train.py
+"""
+Offline GAT-LSTM training over eICU extracts.
+
+Run from the backend/ folder:
+    python -m app.training.train --data-dir /path/to/eicu --work-dir /tmp/eicu_windows
+    python -m app.training.train --synthetic --work-dir /tmp/eicu_smoke --epochs 2
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+from sklearn.metrics import roc_auc_score
+
+from app.models.load_model import GATLSTMModel
+from app.training.eicu_dataset import EICUWindowDataset, build_windows, NUM_FEATURES, WINDOW_HOURS, CHUNK_ROWS
+from app.training.synthetic import make_synthetic_eicu
+
+
+def split_indices(n: int, val_fraction: float, seed: int):
+    """Deterministic train / validation split over stay rows"""
+    perm = np.random.default_rng(seed).permutation(n)
+    n_val = max(1, int(n * val_fraction)) if n > 1 else 0
+    return np.sort(perm[n_val:]), np.sort(perm[:n_val])
+
+
+def make_loader(dataset, batch_size: int, workers: int, shuffle: bool):
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=shuffle,
+        num_workers=workers,
+        persistent_workers=workers > 0,
+        prefetch_factor=4 if workers > 0 else None,
+    )
+
+
+def compute_loss(output, target, mortality_weight: float = 1.0):
+    """output[:, 0] = LOS days, output[:, 1] = mortality logit"""
+    los_loss = nn.functional.smooth_l1_loss(output[:, 0], target[:, 0])
+    mort_loss = nn.functional.binary_cross_entropy_with_logits(output[:, 1], target[:, 1])
+    return los_loss + mortality_weight * mort_loss
+
+
+@torch.no_grad()
+def evaluate(model, loader) -> dict:
+    """LOS / mortality metrics plus inference throughput on a loader"""
+    model.eval()
+    los_pred, los_true, mort_prob, mort_true = [], [], [], []
+    samples, start = 0, time.perf_counter()
+    for x, y in loader:
+        out = model(x)
+        los_pred.append(out[:, 0].numpy())
+        mort_prob.append(torch.sigmoid(out[:, 1]).numpy())
+        los_true.append(y[:, 0].numpy())
+        mort_true.append(y[:, 1].numpy())
+        samples += len(x)
+    elapsed = time.perf_counter() - start
+
+    if samples == 0:
+        return {"samples": 0}
+
+    los_pred, los_true = np.concatenate(los_pred), np.concatenate(los_true)
+    mort_prob, mort_true = np.concatenate(mort_prob), np.concatenate(mort_true)
+    err = los_pred - los_true
+    try:
+        auroc = float(roc_auc_score(mort_true, mort_prob))
+    except ValueError:
+        auroc = None  # only one class present in this split
+
+    return {
+        "samples": int(samples),
+        "los_mae_days": float(np.abs(err).mean()),
+        "los_rmse_days": float(np.sqrt((err ** 2).mean())),
+        "mortality_auroc": auroc,
+        "mortality_accuracy": float(((mort_prob > 0.5) == (mort_true > 0.5)).mean()),
+        "samples_per_sec": float(samples / elapsed) if elapsed > 0 else None,
+    }
+
+
+def train(windows_dir: str, model_path: str, epochs: int = 5, batch_size: int = 256,
+          lr: float = 1e-3, workers: int = 4, val_fraction: float = 0.2, seed: int = 42) -> dict:
+    """Train GATLSTMModel on prebuilt windows and save a state_dict loadable by load_gatlstm_model"""
+    torch.manual_seed(seed)
+
+    full = EICUWindowDataset(windows_dir)
+    train_idx, val_idx = split_indices(len(full), val_fraction, seed)
+    train_loader = make_loader(EICUWindowDataset(windows_dir, train_idx), batch_size, workers, shuffle=True)
+    val_loader = make_loader(EICUWindowDataset(windows_dir, val_idx), batch_size, workers, shuffle=False)
+
+    model = GATLSTMModel(input_size=NUM_FEATURES)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+
+    history = []
+    for epoch in range(1, epochs + 1):
+        model.train()
+        running, samples, start = 0.0, 0, time.perf_counter()
+        for x, y in train_loader:
+            optimizer.zero_grad()
+            loss = compute_loss(model(x), y)
+            loss.backward()
+            optimizer.step()
+            running += loss.item() * len(x)
+            samples += len(x)
+        elapsed = time.perf_counter() - start
+
+        metrics = evaluate(model, val_loader)
+        metrics.update({
+            "epoch": epoch,
+            "train_loss": running / max(samples, 1),
+            "train_samples_per_sec": samples / elapsed if elapsed > 0 else None,
+        })
+        history.append(metrics)
+        print(
+            f"📈 Epoch {epoch}/{epochs} | loss {metrics['train_loss']:.4f} | "
+            f"LOS MAE {metrics.get('los_mae_days', float('nan')):.2f}d | "
+            f"AUROC {metrics.get('mortality_auroc')} | "
+            f"{metrics['train_samples_per_sec'] or 0:.0f} samples/s"
+        )
+
+    os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+    torch.save(model.state_dict(), model_path)
+    with open(os.path.splitext(model_path)[0] + "_metrics.json", "w") as f:
+        json.dump(history, f, indent=2)
+    # feature names + normalisation stats, needed to build serving-time inputs
+    shutil.copyfile(os.path.join(windows_dir, "meta.json"), os.path.splitext(model_path)[0] + "_meta.json")
+    print(f"✅ GAT-LSTM model saved to {model_path}")
+    return history[-1] if history else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the GAT-LSTM model on eICU extracts")
+    parser.add_argument("--data-dir", help="Folder with patient and vitalPeriodic tables (.csv/.csv.gz/.parquet)")
+    parser.add_argument("--work-dir", required=True, help="Where memory-mapped windows are written")
+    parser.add_argument("--model-path", default="app/models/gatlstm_model.pth")
+    parser.add_argument("--synthetic", action="store_true", help="Generate a small synthetic extract into work-dir/raw")
+    parser.add_argument("--skip-build", action="store_true", help="Reuse windows already in work-dir")
+    parser.add_argument("--window-hours", type=int, default=WINDOW_HOURS)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    data_dir = args.data_dir
+    if args.synthetic:
+        data_dir = make_synthetic_eicu(os.path.join(args.work_dir, "raw"), seed=args.seed)
+    if not args.skip_build:
+        if not data_dir:
+            parser.error("--data-dir is required unless --synthetic or --skip-build is given")
+        build_windows(data_dir, args.work_dir, args.window_hours, args.chunk_rows)
+
+    train(args.work_dir, args.model_path, args.epochs, args.batch_size, args.lr, args.workers, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
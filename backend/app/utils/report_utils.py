@@ -3,29 +3,41 @@ import io
 from fastapi.responses import StreamingResponse
 from datetime import datetime
 
+REPORT_HEADER = ["Email", "Prediction Date", "Predicted LOS (days)", "Mortality %", "Risk Level"]
+
+
+def report_row(p: dict) -> list:
+    """One CSV row for a stored prediction"""
+    timestamp = p.get("timestamp")
+    date_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    return [
+        p.get("email"),
+        date_str,
+        p.get("predicted_LOS_days"),
+        p.get("in_hospital_mortality_%"),
+        p.get("mortality_risk_level")
+    ]
+
+
+def report_filename(email: str) -> str:
+    return f"user_report_{email.replace('@', '_at_')}.csv"
+
+
 async def generate_user_report(predictions: list, email: str):
     """Generate a CSV report for a user's predictions"""
     output = io.StringIO()
     writer = csv.writer(output)
     
     # Header row
-    writer.writerow(["Email", "Prediction Date", "Predicted LOS (days)", "Mortality %", "Risk Level"])
+    writer.writerow(REPORT_HEADER)
     
     # Data rows
     for p in predictions:
-        timestamp = p.get("timestamp")
-        date_str = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
-        writer.writerow([
-            p.get("email"),
-            date_str,
-            p.get("predicted_LOS_days"),
-            p.get("in_hospital_mortality_%"),
-            p.get("mortality_risk_level")
-        ])
+        writer.writerow(report_row(p))
     
     output.seek(0)
     
-    filename = f"user_report_{email.replace('@', '_at_')}.csv"
+    filename = report_filename(email)
     return StreamingResponse(
         iter([output.getvalue()]),
         media_type="text/csv",
@@ -15,3 +15,5 @@ print("✅ Connected to MongoDB database:", DB_NAME)
 users_collection = database["users"]
 predictions_collection = database["predictions"]
 contacts_collection = database["contacts"]
+jobs_collection = database["jobs"]
+prediction_archive_collection = database["prediction_archive"]